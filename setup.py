@@ -12,6 +12,7 @@ setup(
     author_email='sales@steelkiwi.com',
     license='MIT',
     url='https://github.com/steelkiwi/django-skd-smoke',
+    python_requires='>=3.4',
     classifiers=[
         'Development Status :: 4 - Beta',
         'Framework :: Django :: 1.7',
@@ -20,9 +21,8 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Operating System :: OS Independent'])
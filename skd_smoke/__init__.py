@@ -1,16 +1,14 @@
 # -*- coding: utf-8 -*-
-from __future__ import unicode_literals, print_function
-
+import itertools
+import os
 import traceback
-from uuid import uuid4
-from six import string_types
+import types
 
 from django.core.exceptions import ImproperlyConfigured
 from django.core.handlers.wsgi import STATUS_CODE_TEXT
 from django.shortcuts import resolve_url
 
 from django.test import TestCase
-from django.utils import six
 
 # start configuration error messages
 IMPROPERLY_BUILT_CONFIGURATION_MSG = \
@@ -29,36 +27,49 @@ UNSUPPORTED_CONFIGURATION_KEY_MSG = \
 
 
 REQUIRED_PARAMS = (
-    {'display_name': 'url', 'expected_type': string_types},
+    {'display_name': 'url', 'expected_type': str},
     {'display_name': 'status', 'expected_type': int},
-    {'display_name': 'method', 'expected_type': string_types},
+    {'display_name': 'method', 'expected_type': str},
 )
 
 
-def check_type(types):
-    def check(obj):
-        return isinstance(obj, types)
-    return check
+# name, expected types and whether any callable is accepted
+NOT_REQUIRED_PARAM_TYPE_CHECK = {
+    'comment': {'type': 'string', 'expected_type': str, 'callable': False},
+    'initialize': {'type': 'callable', 'expected_type': (), 'callable': True},
+    'url_args': {'type': 'list or callable', 'expected_type': (list, tuple),
+                 'callable': True},
+    'url_kwargs': {'type': 'dict or callable', 'expected_type': dict,
+                   'callable': True},
+    'request_data': {'type': 'dict or callable', 'expected_type': dict,
+                     'callable': True},
+    'user_credentials': {'type': 'dict or callable', 'expected_type': dict,
+                         'callable': True},
+    'redirect_to': {'type': 'string', 'expected_type': str,
+                    'callable': False},
+}
 
+# lookups used by ``prepare_configuration`` for every configuration row
+_ALLOWED_OPT_KEYS = frozenset(NOT_REQUIRED_PARAM_TYPE_CHECK)
+_REQUIRED_TYPES = tuple(p['expected_type'] for p in REQUIRED_PARAMS)
+_REQUIRED_NAMES = tuple(p['display_name'] for p in REQUIRED_PARAMS)
 
-def list_or_callable(l):
-    return isinstance(l, (list, tuple)) or callable(l)
+# namespace separators and slashes are replaced to build test method name
+_URL_NAME_TRANS = str.maketrans({':': '_', '/': '_'})
 
+# suffix which makes generated test method names unique
+_name_counter = itertools.count()
 
-def dict_or_callable(d):
-    return isinstance(d, dict) or callable(d)
+# environment variable which turns off configuration type checks
+SKIP_VALIDATION_ENV_VAR = 'SKD_SMOKE_SKIP_VALIDATION'
 
+# prepared configurations by id of initial configuration; initial
+# configuration is stored too so its id cannot be reused by another object
+_prepared_cache = {}
 
-# name and function
-NOT_REQUIRED_PARAM_TYPE_CHECK = {
-    'comment': {'type': 'string', 'func': check_type(string_types)},
-    'initialize': {'type': 'callable', 'func': callable},
-    'url_args': {'type': 'list or callable', 'func': list_or_callable},
-    'url_kwargs': {'type': 'dict or callable', 'func': dict_or_callable},
-    'request_data': {'type': 'dict or callable', 'func': dict_or_callable},
-    'user_credentials': {'type': 'dict or callable', 'func': dict_or_callable},
-    'redirect_to': {'type': 'string', 'func': check_type(string_types)},
-}
+# order in which optional parameters are unpacked from configuration data
+CONFIGURATION_DATA_KEYS = ('comment', 'initialize', 'url_args', 'url_kwargs',
+                           'request_data', 'user_credentials', 'redirect_to')
 
 INCORRECT_REQUIRED_PARAM_TYPE_MSG = \
     'django-skd-smoke: Configuration parameter "%s" with index=%s should be ' \
@@ -75,8 +86,11 @@ LINK_TO_DOCUMENTATION = \
 UNKNOWN_HTTP_METHOD_MSG = \
     'Your django-skd-smoke configuration defines unknown http method: "%s".'
 
-HTTP_METHODS = {'get', 'post', 'head', 'options', 'put', 'patch', 'detete',
-                'trace'}
+# both lower and upper case names are listed to avoid lowering of method
+# name during configuration check in common cases
+HTTP_METHODS = frozenset({'get', 'GET', 'post', 'POST', 'head', 'HEAD',
+                          'options', 'OPTIONS', 'put', 'PUT', 'patch', 'PATCH',
+                          'delete', 'DELETE', 'trace', 'TRACE'})
 
 INCORRECT_USER_CREDENTIALS = \
     'Authentication process failed. Supplied user credentials are incorrect: '\
@@ -100,91 +114,174 @@ def prepare_configuration(tests_configuration):
     :raises: ``django.core.exceptions.ImproperlyConfigured`` if there is any \
         problem with supplied ``tests_configuration``
     """
+    cached = _prepared_cache.get(id(tests_configuration))
+    if cached is not None and cached[0] is tests_configuration:
+        return cached[1]
+
+    if not isinstance(tests_configuration, (tuple, list)):
+        raise ImproperlyConfigured(
+            append_doc_link(INCORRECT_TEST_CONFIGURATION_MSG))
+
+    if not tests_configuration:
+        raise ImproperlyConfigured(
+            append_doc_link(EMPTY_TEST_CONFIGURATION_MSG))
+
     confs = []
+    number_of_required_params = len(REQUIRED_PARAMS)
+    total_number_of_params = number_of_required_params + 1
+    skip_validation = os.environ.get(SKIP_VALIDATION_ENV_VAR)
+
+    for test_config in tests_configuration:
+        # row structure is checked even if validation is skipped
+        if len(test_config) == number_of_required_params:
+            test_config += ({},)
+            check_dict = False
+        elif len(test_config) == total_number_of_params and \
+                isinstance(test_config[-1], dict):
+            check_dict = True
+        else:
+            raise ImproperlyConfigured(
+                append_doc_link(IMPROPERLY_BUILT_CONFIGURATION_MSG)
+            )
 
-    if isinstance(tests_configuration, (tuple, list)):
-
-        number_of_required_params = len(REQUIRED_PARAMS)
-        total_number_of_params = number_of_required_params + 1
-
-        for test_config in tests_configuration:
-            if len(test_config) == number_of_required_params:
-                test_config += ({},)
-                check_dict = False
-            elif len(test_config) == total_number_of_params:
-                diff = set(test_config[-1].keys()) - \
-                       set(NOT_REQUIRED_PARAM_TYPE_CHECK.keys())
-                if diff:
-                    raise ImproperlyConfigured(
-                        append_doc_link(UNSUPPORTED_CONFIGURATION_KEY_MSG %
-                                        ', '.join(diff))
-                    )
-                check_dict = True
-            else:
+        if skip_validation:
+            confs.append(test_config)
+            continue
+
+        if check_dict:
+            diff = test_config[-1].keys() - _ALLOWED_OPT_KEYS
+            if diff:
                 raise ImproperlyConfigured(
-                    append_doc_link(IMPROPERLY_BUILT_CONFIGURATION_MSG)
+                    append_doc_link(UNSUPPORTED_CONFIGURATION_KEY_MSG %
+                                    ', '.join(sorted(diff)))
                 )
 
-            type_errors = []
-
-            # required params check
-            for idx, required_param in enumerate(test_config[:3]):
-                required_type = REQUIRED_PARAMS[idx]['expected_type']
-                if not isinstance(required_param, required_type):
+        # error list is created on first error only
+        type_errors = None
+
+        # required params check
+        url, status, http_method = \
+            test_config[0], test_config[1], test_config[2]
+
+        if not isinstance(url, _REQUIRED_TYPES[0]):
+            type_errors = type_errors or []
+            type_errors.append(
+                INCORRECT_REQUIRED_PARAM_TYPE_MSG %
+                (_REQUIRED_NAMES[0], 0, _REQUIRED_TYPES[0], type(url),
+                 url)
+            )
+
+        if not isinstance(status, _REQUIRED_TYPES[1]):
+            type_errors = type_errors or []
+            type_errors.append(
+                INCORRECT_REQUIRED_PARAM_TYPE_MSG %
+                (_REQUIRED_NAMES[1], 1, _REQUIRED_TYPES[1], type(status),
+                 status)
+            )
+
+        if not isinstance(http_method, _REQUIRED_TYPES[2]):
+            type_errors = type_errors or []
+            type_errors.append(
+                INCORRECT_REQUIRED_PARAM_TYPE_MSG %
+                (_REQUIRED_NAMES[2], 2, _REQUIRED_TYPES[2],
+                 type(http_method), http_method)
+            )
+        elif http_method not in HTTP_METHODS and \
+                http_method.lower() not in HTTP_METHODS:
+            type_errors = type_errors or []
+            type_errors.append(UNKNOWN_HTTP_METHOD_MSG % http_method)
+
+        # not required params check
+        if check_dict:
+            for key, value in test_config[-1].items():
+                type_info = NOT_REQUIRED_PARAM_TYPE_CHECK[key]
+                if not (isinstance(value, type_info['expected_type']) or
+                        type_info['callable'] and callable(value)):
+                    type_errors = type_errors or []
                     type_errors.append(
-                        INCORRECT_REQUIRED_PARAM_TYPE_MSG %
-                        (REQUIRED_PARAMS[idx]['display_name'], idx,
-                         required_type, type(required_param), required_param)
+                        INCORRECT_NOT_REQUIRED_PARAM_TYPE_MSG %
+                        (key, type_info['type'], type(value), value)
                     )
 
-            http_method = test_config[2]
-            if isinstance(http_method, REQUIRED_PARAMS[2]['expected_type']) \
-                    and http_method.lower() not in HTTP_METHODS:
-                type_errors.append(UNKNOWN_HTTP_METHOD_MSG % http_method)
-
-            # not required params check
-            if check_dict:
-                for key, value in test_config[-1].items():
-                    type_info = NOT_REQUIRED_PARAM_TYPE_CHECK[key]
-                    function = type_info['func']
-                    if not function(value):
-                        type_errors.append(
-                            INCORRECT_NOT_REQUIRED_PARAM_TYPE_MSG %
-                            (key, type_info['type'], type(value), value)
-                        )
-
-            if type_errors:
-                type_errors.append(LINK_TO_DOCUMENTATION)
-                raise ImproperlyConfigured('\n'.join(type_errors))
+        if type_errors:
+            type_errors.append(LINK_TO_DOCUMENTATION)
+            raise ImproperlyConfigured('\n'.join(type_errors))
 
-            confs.append(test_config)
+        confs.append(test_config)
 
-        if not confs:
-            raise ImproperlyConfigured(
-                append_doc_link(EMPTY_TEST_CONFIGURATION_MSG))
-
-    else:
-        raise ImproperlyConfigured(
-            append_doc_link(INCORRECT_TEST_CONFIGURATION_MSG))
+    # lists are not cached as they can be changed between class definitions
+    if isinstance(tests_configuration, tuple) and not skip_validation:
+        _prepared_cache[id(tests_configuration)] = (tests_configuration, confs)
 
     return confs
 
 
-def generate_fail_test_method(exception_stacktrace):
+def generate_fail_test_method(exception):
     """
     Generates test method which fails and informs user about occurred
-    exception.
+    exception. Stacktrace is formatted only when the method is called.
 
-    :param exception_stacktrace: stacktrace of occurred exception
+    :param exception: occurred exception
     :return: method which takes ``TestCase`` and calls its ``fail`` method \
-        with provided ``exception_stacktrace``
+        with stacktrace of provided ``exception``
     """
     def fail_method(self):
-        self.fail(exception_stacktrace)
+        self.fail(''.join(traceback.format_exception(
+            type(exception), exception, exception.__traceback__)))
     return fail_method
 
 
-def generate_test_method(urlname, status, method='GET', initialize=None,
+def _run_smoke_test(self, config):
+    """
+    Shared body of every generated test method. Each generated method is a
+    copy of this function which gets its own ``config`` as default value
+    (see ``generate_test_method``) so no closure is created per test.
+
+    :param self: ``TestCase`` instance
+    :param config: tuple of test parameters prepared by \
+        ``generate_test_method``
+    """
+    urlname, status, method, initialize, url_args, url_kwargs, \
+        request_data, user_credentials, redirect_to = config
+
+    if initialize:
+        initialize(self)
+
+    if callable(url_args):
+        prepared_url_args = url_args(self)
+    else:
+        prepared_url_args = url_args or []
+
+    if callable(url_kwargs):
+        prepared_url_kwargs = url_kwargs(self)
+    else:
+        prepared_url_kwargs = url_kwargs or {}
+
+    resolved_url = resolve_url(
+        urlname, *prepared_url_args, **prepared_url_kwargs)
+
+    client = self.client
+    if user_credentials:
+        if callable(user_credentials):
+            credentials = user_credentials(self)
+        else:
+            credentials = user_credentials
+        logged_in = client.login(**credentials)
+        self.assertTrue(
+            logged_in, INCORRECT_USER_CREDENTIALS % credentials)
+    function = getattr(client, method)
+    if callable(request_data):
+        prepared_data = request_data(self)
+    else:
+        prepared_data = request_data or {}
+    response = function(resolved_url, data=prepared_data)
+    self.assertEqual(response.status_code, status)
+    if status in (301, 302, 303, 307) and redirect_to:
+        self.assertRedirects(response, redirect_to,
+                             fetch_redirect_response=False)
+
+
+def generate_test_method(urlname, status, method='get', initialize=None,
                          url_args=None, url_kwargs=None, request_data=None,
                          user_credentials=None, redirect_to=None):
     """
@@ -195,7 +292,7 @@ def generate_test_method(urlname, status, method='GET', initialize=None,
 
     :param urlname: plain url or urlname or namespace:urlname
     :param status: http status code
-    :param method: http method (get, post, etc.)
+    :param method: lower case http method (get, post, etc.)
     :param initialize: callable object which is called in the very beginning \
         of test method
     :param url_args: list or callable object which returns args list to \
@@ -211,41 +308,12 @@ def generate_test_method(urlname, status, method='GET', initialize=None,
     :return: new test method
 
     """
-    def new_test_method(self):
-        if initialize:
-            initialize(self)
-
-        if callable(url_args):
-            prepared_url_args = url_args(self)
-        else:
-            prepared_url_args = url_args or []
-
-        if callable(url_kwargs):
-            prepared_url_kwargs = url_kwargs(self)
-        else:
-            prepared_url_kwargs = url_kwargs or {}
-
-        resolved_url = resolve_url(
-            urlname, *prepared_url_args, **prepared_url_kwargs)
-
-        if user_credentials:
-            if callable(user_credentials):
-                credentials = user_credentials(self)
-            else:
-                credentials = user_credentials
-            logged_in = self.client.login(**credentials)
-            self.assertTrue(
-                logged_in, INCORRECT_USER_CREDENTIALS % credentials)
-        function = getattr(self.client, method.lower())
-        if callable(request_data):
-            prepared_data = request_data(self)
-        else:
-            prepared_data = request_data or {}
-        response = function(resolved_url, data=prepared_data)
-        self.assertEqual(response.status_code, status)
-        if status in (301, 302, 303, 307) and redirect_to:
-            self.assertRedirects(response, redirect_to,
-                                 fetch_redirect_response=False)
+    config = (urlname, status, method, initialize, url_args,
+              url_kwargs, request_data, user_credentials, redirect_to)
+    new_test_method = types.FunctionType(_run_smoke_test.__code__,
+                                         _run_smoke_test.__globals__,
+                                         'new_test_method', (config,))
+    new_test_method.__qualname__ = 'new_test_method'
     return new_test_method
 
 
@@ -254,19 +322,13 @@ def prepare_test_name(urlname, method, status):
     Prepares name for smoke test method with supplied parameters.
 
     :param urlname: initial urlname
-    :param method: http method (get, post, etc.)
+    :param method: lower case http method (get, post, etc.)
     :param status: http status code
     :return: test name
     """
-    prepared_url = urlname.replace(':', '_').strip('/').replace('/', '_')
-    prepared_method = method.lower()
-    name = 'test_smoke_%(url)s_%(method)s_%(status)s_%(uuid)s' % {
-        'url': prepared_url,
-        'method': prepared_method,
-        'status': status,
-        'uuid': uuid4().hex
-    }
-    return name
+    prepared_url = urlname.translate(_URL_NAME_TRANS).strip('_')
+    return 'test_smoke_%s_%s_%s_%s' % (prepared_url, method, status,
+                                       next(_name_counter))
 
 
 def prepare_test_method_doc(method, urlname, status, status_text, data,
@@ -286,13 +348,8 @@ def prepare_test_method_doc(method, urlname, status, status_text, data,
         data = data.__name__
     else:
         data = data or {}
-    result = '%(method)s %(urlname)s %(status)s "%(status_text)s" %(data)r' % {
-        'method': method.upper(),
-        'urlname': urlname,
-        'status': status,
-        'status_text': status_text,
-        'data': data
-    }
+    result = '%s %s %s "%s" %r' % (method.upper(), urlname, status,
+                                   status_text, data)
     # append comment to the end if any
     if comment:
         result = '%s %s' % (result, comment)
@@ -320,44 +377,61 @@ class GenerateTestMethodsMeta(type):
         if not parents:
             return cls
 
+        # module level names are bound to locals once as the loop below
+        # runs for every configuration row
+        status_text_get = STATUS_CODE_TEXT.get
+        make_name = prepare_test_name
+        make_doc = prepare_test_method_doc
+        make_method = generate_test_method
+        data_keys = CONFIGURATION_DATA_KEYS
+
+        # methods are collected first and added only if every row is built
+        # so any configuration problem results in the fail method alone
+        test_methods = []
+
         # noinspection PyBroadException
         try:
             config = prepare_configuration(cls.TESTS_CONFIGURATION)
-        except Exception:
-            fail_method = generate_fail_test_method(traceback.format_exc())
-            fail_method_name = cls.FAIL_METHOD_NAME
-            fail_method.__name__ = str(fail_method_name)
 
-            setattr(cls, fail_method_name, fail_method)
-        else:
             for urlname, status, method, data in config:
-                comment = data.get('comment', None)
-                initialize = data.get('initialize', None)
-                url_args = data.get('url_args', None)
-                url_kwargs = data.get('url_kwargs', None)
-                request_data = data.get('request_data', None)
-                get_user_credentials = data.get('user_credentials', None)
-                redirect_to = data.get('redirect_to', None)
-                status_text = STATUS_CODE_TEXT.get(status, 'UNKNOWN')
-
-                test_method_name = prepare_test_name(urlname, method, status)
-
-                test_method = generate_test_method(
-                    urlname, status, method, initialize, url_args, url_kwargs,
-                    request_data, get_user_credentials, redirect_to
+                comment, initialize, url_args, url_kwargs, request_data, \
+                    get_user_credentials, redirect_to = \
+                    [data.get(key) for key in data_keys]
+                status_text = status_text_get(status, 'UNKNOWN')
+                method_lower = method.lower()
+
+                test_method_name = make_name(urlname, method_lower, status)
+
+                test_method = make_method(
+                    urlname, status, method_lower, initialize, url_args,
+                    url_kwargs, request_data, get_user_credentials,
+                    redirect_to
                 )
-                test_method.__name__ = str(test_method_name)
-                test_method.__doc__ = prepare_test_method_doc(
+                test_method.__name__ = test_method_name
+                test_method.__qualname__ = '%s.%s' % (cls.__qualname__,
+                                                      test_method_name)
+                test_method.__doc__ = make_doc(
                     method, urlname, status, status_text, request_data,
                     comment
                 )
 
-                setattr(cls, test_method_name, test_method)
+                test_methods.append(test_method)
+        except Exception as e:
+            fail_method = generate_fail_test_method(e)
+            fail_method_name = cls.FAIL_METHOD_NAME
+            fail_method.__name__ = fail_method_name
+            fail_method.__qualname__ = '%s.%s' % (cls.__qualname__,
+                                                  fail_method_name)
+
+            setattr(cls, fail_method_name, fail_method)
+        else:
+            for test_method in test_methods:
+                setattr(cls, test_method.__name__, test_method)
 
         return cls
 
 
-class SmokeTestCase(six.with_metaclass(GenerateTestMethodsMeta, TestCase)):
+class SmokeTestCase(TestCase, metaclass=GenerateTestMethodsMeta):
     """
     TestCase which should be derived by any library user. It's required
     to define ``TESTS_CONFIGURATION`` inside subclass. It should be defined as
@@ -1,3 +1 @@
 # -*- coding: utf-8 -*-
-from __future__ import unicode_literals
-
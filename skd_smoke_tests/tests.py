@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
-from __future__ import unicode_literals, print_function
+import itertools
+import os
 import types
 from unittest import TestCase
 
 from mock import Mock, patch
 from django.core.exceptions import ImproperlyConfigured
 from django.core.handlers.wsgi import STATUS_CODE_TEXT
-from six import string_types
 
 from skd_smoke import generate_test_method, prepare_test_name, \
     prepare_configuration, generate_fail_test_method, prepare_test_method_doc,\
@@ -15,7 +15,7 @@ from skd_smoke import generate_test_method, prepare_test_name, \
     NOT_REQUIRED_PARAM_TYPE_CHECK, UNSUPPORTED_CONFIGURATION_KEY_MSG, \
     UNKNOWN_HTTP_METHOD_MSG, HTTP_METHODS, LINK_TO_DOCUMENTATION, \
     INCORRECT_REQUIRED_PARAM_TYPE_MSG, REQUIRED_PARAMS, \
-    INCORRECT_NOT_REQUIRED_PARAM_TYPE_MSG
+    INCORRECT_NOT_REQUIRED_PARAM_TYPE_MSG, SKIP_VALIDATION_ENV_VAR
 
 
 class SmokeGeneratorTestCase(TestCase):
@@ -23,18 +23,17 @@ class SmokeGeneratorTestCase(TestCase):
     def test_required_params_definition(self):
         for param_setting in REQUIRED_PARAMS:
             self.assertIn('display_name', param_setting)
-            self.assertIsInstance(param_setting['display_name'], string_types)
+            self.assertIsInstance(param_setting['display_name'], str)
             self.assertIn('expected_type', param_setting)
 
     def test_non_required_params_definition(self):
         for param_name, param_type in NOT_REQUIRED_PARAM_TYPE_CHECK.items():
-            self.assertIsInstance(param_name, string_types)
+            self.assertIsInstance(param_name, str)
             self.assertIn('type', param_type)
-            self.assertIsInstance(param_type['type'], string_types)
-            self.assertIn('func', param_type)
-            self.assertTrue(callable(param_type['func']),
-                            'Non-required parameter type check func must be '
-                            'callable.')
+            self.assertIsInstance(param_type['type'], str)
+            self.assertIn('expected_type', param_type)
+            self.assertIn('callable', param_type)
+            self.assertIsInstance(param_type['callable'], bool)
 
     def test_prepare_configuration(self):
         test = prepare_configuration([('a', 200, 'GET'),
@@ -43,6 +42,33 @@ class SmokeGeneratorTestCase(TestCase):
         self.assertEqual(
             test, [('a', 200, 'GET', {}), ('b', 200, 'GET', {})])
 
+    def test_prepare_configuration_is_cached_for_tuple(self):
+        config = (('a', 200, 'GET'),)
+        test = prepare_configuration(config)
+        self.assertIs(prepare_configuration(config), test)
+
+    def test_prepare_configuration_is_not_cached_for_list(self):
+        config = [('a', 200, 'GET')]
+        test = prepare_configuration(config)
+        config.append(('b', 200, 'GET'))
+        self.assertEqual(prepare_configuration(config),
+                         test + [('b', 200, 'GET', {})])
+
+    @patch.dict(os.environ, {SKIP_VALIDATION_ENV_VAR: '1'})
+    def test_prepare_configuration_with_malformed_row_without_validation(
+            self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            prepare_configuration([('a', 200)])
+        self.assertIn(IMPROPERLY_BUILT_CONFIGURATION_MSG, str(cm.exception))
+
+    @patch.dict(os.environ, {SKIP_VALIDATION_ENV_VAR: '1'})
+    def test_prepare_configuration_without_validation(self):
+        test = prepare_configuration([('a', 200, 'unknown'),
+                                      ('b', 200, 'GET', {'unknown': 1})])
+        self.assertEqual(
+            test,
+            [('a', 200, 'unknown', {}), ('b', 200, 'GET', {'unknown': 1})])
+
     def test_prepare_configuration_with_incorrect_http_method(self):
         unknown_http_method = 'unknown'
         with self.assertRaises(ImproperlyConfigured) as cm:
@@ -52,15 +78,27 @@ class SmokeGeneratorTestCase(TestCase):
         self.assertIn(UNKNOWN_HTTP_METHOD_MSG % unknown_http_method,
                       exception_msg)
 
+    def test_prepare_configuration_with_non_string_http_method(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            prepare_configuration([('a', 200, 666)])
+        exception_msg = str(cm.exception)
+        self.assertIn(
+            INCORRECT_REQUIRED_PARAM_TYPE_MSG % (
+                REQUIRED_PARAMS[2]['display_name'], 2,
+                REQUIRED_PARAMS[2]['expected_type'], int, 666
+            ),
+            exception_msg)
+        self.assertNotIn(UNKNOWN_HTTP_METHOD_MSG % 666, exception_msg)
+
     def test_prepare_configuration_with_all_incorrect_parameters(self):
         incorrect_required_params = [
-            100500,  # url should be string_types
+            100500,  # url should be str
             'incorrect',  # status should be int
-            666  # method should be string_types
+            666  # method should be str
         ]
         incorrect_not_required_params = {
-            'redirect_to': 123,  # should be string_types
-            'comment': 123,  # should be string_types
+            'redirect_to': 123,  # should be str
+            'comment': 123,  # should be str
             'initialize': 'initialize',  # should be callable
             'url_args': 'url_args',  # should be list or callable
             'url_kwargs': 'url_kwargs',  # should be dict or callable
@@ -105,33 +143,60 @@ class SmokeGeneratorTestCase(TestCase):
         prepared_config = prepare_configuration(config)
         self.assertEqual(config, prepared_config)
 
+    def test_prepare_configuration_with_mixed_case_http_method(self):
+        config = [('url', 200, 'Delete', {})]
+        prepared_config = prepare_configuration(config)
+        self.assertEqual(config, prepared_config)
+
     def test_generate_fail_test_method(self):
-        test = generate_fail_test_method('test')
+        try:
+            raise ImproperlyConfigured('test')
+        except ImproperlyConfigured as e:
+            test = generate_fail_test_method(e)
         self.assertIsNotNone(test)
         self.assertEqual(type(test), types.FunctionType)
         self.assertEqual(test.__name__, 'fail_method')
 
+        testcase_mock = Mock(fail=Mock())
+        test(testcase_mock)
+        self.assertEqual(testcase_mock.fail.call_count, 1)
+        stacktrace = testcase_mock.fail.call_args_list[0][0][0]
+        self.assertIn('Traceback', stacktrace)
+        self.assertIn('ImproperlyConfigured: test', stacktrace)
+
     def test_generate_test_method(self):
         test = generate_test_method('urlname', 200)
         self.assertIsNotNone(test)
         self.assertEqual(type(test), types.FunctionType)
         self.assertEqual(test.__name__, 'new_test_method')
+        self.assertEqual(test.__qualname__, 'new_test_method')
+
+    def test_generated_test_methods_share_code(self):
+        test1 = generate_test_method('urlname1', 200)
+        test2 = generate_test_method('urlname2', 404, 'post')
+        self.assertIs(test1.__code__, test2.__code__)
+        self.assertIsNone(test1.__closure__)
+        self.assertIsNone(test2.__closure__)
 
     def test_prepare_test_name_with_just_urlname(self):
-        test = prepare_test_name('urlname', 'GET', 200)
+        test = prepare_test_name('urlname', 'get', 200)
         name = test[0:test.rfind('_')]
         self.assertEqual(name, 'test_smoke_urlname_get_200')
 
     def test_prepare_test_name_with_namespace_urlname(self):
-        test = prepare_test_name('namespace:urlname', 'GET', 200)
+        test = prepare_test_name('namespace:urlname', 'get', 200)
         name = test[0:test.rfind('_')]
         self.assertEqual(name, 'test_smoke_namespace_urlname_get_200')
 
     def test_prepare_test_name_with_plain_url(self):
-        test = prepare_test_name('/enclosed/url/', 'GET', 200)
+        test = prepare_test_name('/enclosed/url/', 'get', 200)
         name = test[0:test.rfind('_')]
         self.assertEqual(name, 'test_smoke_enclosed_url_get_200')
 
+    def test_prepare_test_name_is_unique(self):
+        self.assertNotEqual(prepare_test_name('urlname', 'get', 200),
+                            prepare_test_name('urlname', 'get', 200))
+
     def test_prepare_test_method_doc(self):
         test = prepare_test_method_doc('GET', 'urlname', 200, 'status_text',
                                        None)
@@ -202,8 +267,10 @@ class SmokeTestCaseTestCase(TestCase):
         _, status_code, method, params = configuration
         method_lower = method.lower()
 
-        # check __name__
+        # check __name__ and __qualname__
         self.assertEqual(test_method.__name__, name)
+        self.assertEqual(test_method.__qualname__,
+                         '%s.%s' % (cls.__qualname__, name))
 
         # check __doc__
         self.assertEqual(test_method.__doc__, doc)
@@ -332,7 +399,48 @@ class SmokeTestCaseTestCase(TestCase):
 
         self.assert_called_fail_test_method(
             BrokenConfig,
-            UNSUPPORTED_CONFIGURATION_KEY_MSG % ', '.join(unsupported_keys)
+            UNSUPPORTED_CONFIGURATION_KEY_MSG %
+            ', '.join(sorted(unsupported_keys))
+        )
+
+    @patch.dict(os.environ, {SKIP_VALIDATION_ENV_VAR: '1'})
+    def test_configuration_built_incorrectly_without_validation(self):
+        for conf in (
+            (('a', 200),),  # too few arguments
+            (('a', 200, 'GET', 'data'),),  # data is not a dict
+        ):
+            BrokenConfig = type(
+                str('BrokenConfig'),
+                (SmokeTestCase,),
+                {'TESTS_CONFIGURATION': conf})
+            self.assertFalse(
+                self.check_if_class_contains_test_methods(BrokenConfig),
+                'TestCase contains generated test method but should not '
+                '(test configuration is broken).'
+            )
+            self.assert_called_fail_test_method(
+                BrokenConfig, IMPROPERLY_BUILT_CONFIGURATION_MSG)
+
+    @patch.dict(os.environ, {SKIP_VALIDATION_ENV_VAR: '1'})
+    def test_configuration_with_incorrect_types_without_validation(self):
+        conf = (
+            ('a', 200, 'GET'),
+            (100500, 200, 'GET'),  # url should be str
+        )
+
+        BrokenConfig = type(
+            str('BrokenConfig'),
+            (SmokeTestCase,),
+            {'TESTS_CONFIGURATION': conf})
+        self.assertFalse(
+            self.check_if_class_contains_test_methods(BrokenConfig),
+            'TestCase contains generated test method but should not '
+            '(test configuration is broken).'
+        )
+        self.assertTrue(
+            self.check_if_class_contains_fail_test_method(BrokenConfig),
+            'Generated TestCase should contain one fake test method to inform '
+            'that its configuration is broken.'
         )
 
     def test_simple_correct_configuration(self):
@@ -359,10 +467,9 @@ class SmokeTestCaseTestCase(TestCase):
             'TestCase should contain at least one generated test method.'
         )
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
-    def test_simple_generated_test_methods(self, mock_django_resolve_url,
-                                           mock_uuid4):
+    def test_simple_generated_test_methods(self, mock_django_resolve_url):
         conf = (
             ('/some_url/', 302, 'GET', {'comment': 'text comment'}),
             ('/comments/', 201, 'POST',
@@ -372,16 +479,15 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_some_url_get_302_ffffffff',
-            'test_smoke_comments_post_201_ffffffff',
-            'test_smoke_namespace_url_get_200_ffffffff',
-            'test_smoke_some_url2_get_200_ffffffff',
+            'test_smoke_some_url_get_302_0',
+            'test_smoke_comments_post_201_0',
+            'test_smoke_namespace_url_get_200_0',
+            'test_smoke_some_url2_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -406,10 +512,10 @@ class SmokeTestCaseTestCase(TestCase):
             self.assert_generated_test_method(CorrectConfig, name, conf[i],
                                               expected_docs[i], url)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_redirect_to_setting(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         redirect_url = '/redirect_url/'
 
@@ -418,13 +524,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_get_302_ffffffff',
+            'test_smoke_urlname_get_302_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -449,10 +554,10 @@ class SmokeTestCaseTestCase(TestCase):
             CorrectConfig, expected_test_method_names[0], conf[0],
             expected_docs[0], url, redirect_to=redirect_url)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_initialize_callable(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         initialize_mock = Mock()
 
@@ -461,13 +566,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_slug_get_200_ffffffff',
+            'test_smoke_urlname_with_slug_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -494,10 +598,10 @@ class SmokeTestCaseTestCase(TestCase):
 
         self.assertEqual(initialize_mock.call_count, 1)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_url_kwargs_as_dict(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         url_kwargs = {'slug': 'cool_article'}
 
@@ -507,13 +611,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_slug_get_200_ffffffff',
+            'test_smoke_urlname_with_slug_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -543,10 +646,10 @@ class SmokeTestCaseTestCase(TestCase):
         mock_django_resolve_url.assert_called_once_with(
             conf[0][0], **url_kwargs)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_url_kwargs_as_callable(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         url_kwargs = {'slug': 'cool_article'}
 
@@ -559,13 +662,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_slug_get_200_ffffffff',
+            'test_smoke_urlname_with_slug_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -595,10 +697,10 @@ class SmokeTestCaseTestCase(TestCase):
         mock_django_resolve_url.assert_called_once_with(
             conf[0][0], **url_kwargs)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_url_args_as_list(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         url_args = ['arg1']
 
@@ -608,13 +710,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_arg_get_200_ffffffff',
+            'test_smoke_urlname_with_arg_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -644,10 +745,10 @@ class SmokeTestCaseTestCase(TestCase):
         mock_django_resolve_url.assert_called_once_with(
             conf[0][0], *url_args)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_url_args_as_callable(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         url_args = ['arg1']
 
@@ -660,13 +761,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_arg_get_200_ffffffff',
+            'test_smoke_urlname_with_arg_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -696,10 +796,10 @@ class SmokeTestCaseTestCase(TestCase):
         mock_django_resolve_url.assert_called_once_with(
             conf[0][0], *url_args)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_user_credentials_as_dict(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         user_credentials = {'username': 'test_user', 'password': '1234'}
 
@@ -709,13 +809,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_slug_get_200_ffffffff',
+            'test_smoke_urlname_with_slug_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -740,10 +839,10 @@ class SmokeTestCaseTestCase(TestCase):
             CorrectConfig, expected_test_method_names[0], conf[0],
             expected_docs[0], url, user_credentials)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_user_credentials_as_callable(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         user_credentials = {'username': 'test_user', 'password': '1234'}
 
@@ -756,13 +855,12 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_urlname_with_slug_get_200_ffffffff',
+            'test_smoke_urlname_with_slug_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -787,10 +885,10 @@ class SmokeTestCaseTestCase(TestCase):
             CorrectConfig, expected_test_method_names[0], conf[0],
             expected_docs[0], url, user_credentials)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_request_data_as_dict(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         request_data = {'message': 'new comment'}
 
@@ -803,16 +901,15 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_some_url_get_200_ffffffff',
-            'test_smoke_comments_post_201_ffffffff',
-            'test_smoke_namespace_url_get_200_ffffffff',
-            'test_smoke_some_url2_get_200_ffffffff',
+            'test_smoke_some_url_get_200_0',
+            'test_smoke_comments_post_201_0',
+            'test_smoke_namespace_url_get_200_0',
+            'test_smoke_some_url2_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),
@@ -837,10 +934,10 @@ class SmokeTestCaseTestCase(TestCase):
             self.assert_generated_test_method(CorrectConfig, name, conf[i],
                                               expected_docs[i], url)
 
-    @patch('skd_smoke.uuid4')
+    @patch('skd_smoke._name_counter', itertools.repeat(0))
     @patch('skd_smoke.resolve_url')
     def test_generated_test_method_with_request_data_as_callable(
-            self, mock_django_resolve_url, mock_uuid4):
+            self, mock_django_resolve_url):
 
         request_data = {'message': 'new comment'}
 
@@ -856,16 +953,15 @@ class SmokeTestCaseTestCase(TestCase):
         )
 
         expected_test_method_names = [
-            'test_smoke_some_url_get_200_ffffffff',
-            'test_smoke_comments_post_201_ffffffff',
-            'test_smoke_namespace_url_get_200_ffffffff',
-            'test_smoke_some_url2_get_200_ffffffff',
+            'test_smoke_some_url_get_200_0',
+            'test_smoke_comments_post_201_0',
+            'test_smoke_namespace_url_get_200_0',
+            'test_smoke_some_url2_get_200_0',
         ]
 
         expected_docs = self.generate_docs_from_configuration(conf)
 
         mock_django_resolve_url.return_value = url = '/url/'
-        mock_uuid4.return_value = Mock(hex='ffffffff')
 
         CorrectConfig = type(
             str('CorrectConfig'),